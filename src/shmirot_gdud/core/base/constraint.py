@@ -1,29 +1,55 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional, TYPE_CHECKING
+from typing import Any, ClassVar, Dict, Optional, Type, TYPE_CHECKING
+import itertools
+import uuid
 
 if TYPE_CHECKING:
     from shmirot_gdud.core.models import ScheduleSlot
     from shmirot_gdud.core.base.context import ScheduleContext
 
+# One random prefix per process keeps ids unique across saved files,
+# while the counter makes minting a new id cheap.
+_UID_PREFIX = uuid.uuid4().hex[:8]
+_next_uid_number = itertools.count(1).__next__
+
+def new_uid() -> str:
+    """Returns a new id for a constraint or staffing rule."""
+    return f"{_UID_PREFIX}-{_next_uid_number()}"
+
 class ConstraintBase(ABC):
     """
     Abstract base class for all constraints.
+    Subclasses set TYPE_ID, DISPLAY_NAME and IS_HARD as class constants.
     """
+    TYPE_ID: ClassVar[str] = ""
+    DISPLAY_NAME: ClassVar[str] = ""
+    # Hard constraints are checked for validity, soft ones only affect the score
+    IS_HARD: ClassVar[bool] = False
+    # False when calculate_score also looks at other slots (e.g. the partner
+    # position), so a slot's score can change without the slot itself changing
+    SLOT_LOCAL_SCORE: ClassVar[bool] = True
+    # TYPE_ID -> subclass, filled in as subclasses are defined
+    _registry: ClassVar[Dict[str, Type['ConstraintBase']]] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.TYPE_ID:
+            ConstraintBase._registry[cls.TYPE_ID] = cls
     
     def __init__(self):
         # Unique ID for state tracking (e.g. usage counters)
-        import uuid
-        self.uid = str(uuid.uuid4())
+        self.uid = new_uid()
 
-    @abstractmethod
     def get_type_id(self) -> str:
         """Returns a unique string identifier for this constraint type."""
-        pass
+        return self.TYPE_ID
 
-    @abstractmethod
     def get_display_name(self) -> str:
         """Returns the name to display on the button in the GUI."""
-        pass
+        return self.DISPLAY_NAME
+
+    def is_hard_constraint(self) -> bool:
+        return self.IS_HARD
 
     @abstractmethod
     def get_status_text(self) -> str:
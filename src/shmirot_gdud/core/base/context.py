@@ -1,7 +1,8 @@
 from typing import Dict, Any, Optional, Tuple, Set
+from collections import Counter
 from dataclasses import dataclass, field
 
-@dataclass
+@dataclass(slots=True)
 class ScheduleContext:
     """
     Holds the global state of the schedule and provides helper methods for constraints.
@@ -10,21 +11,46 @@ class ScheduleContext:
     # Reference to the full schedule slots map (date, hour, pos) -> Slot
     slot_map: Dict[Tuple[str, int, int], Any]
     
-    # Usage counters for capacity constraints: (constraint_uid) -> count
-    usage_counters: Dict[str, int] = field(default_factory=dict)
+    # Usage counters for capacity constraints: (rule_uid) -> count.
+    # A Counter so missing keys read as 0 and callers can update in place.
+    usage_counters: Counter = field(default_factory=Counter)
     
     # Context specific fields for validation
     group_id: Optional[str] = None
     other_group_id: Optional[str] = None
     is_initial_fill: bool = False
     
+    # Slot key -> the slot at the other position in the same hour (or None),
+    # precomputed from slot_map so lookups skip building a tuple key
+    _partners: Dict[int, Any] = field(default_factory=dict, init=False, repr=False)
+    
+    def __post_init__(self):
+        self.index_partners()
+    
+    def index_partners(self):
+        """Call after filling slot_map in place so get_other_slot sees the new slots."""
+        slot_map = self.slot_map
+        self._partners = {
+            s._key: slot_map.get((date_str, hour, 2 if pos == 1 else 1))
+            for (date_str, hour, pos), s in slot_map.items()
+        }
+    
     # Helper to get the other slot in the same hour
     def get_other_slot(self, slot: Any) -> Optional[Any]:
-        other_pos = 2 if slot.position == 1 else 1
-        return self.slot_map.get((slot.date, slot.hour, other_pos))
-
-    def get_usage(self, constraint_uid: str) -> int:
-        return self.usage_counters.get(constraint_uid, 0)
+        try:
+            return self._partners[slot._key]
+        except KeyError:  # Not in slot_map when it was indexed
+            other_pos = 2 if slot.position == 1 else 1
+            return self.slot_map.get((slot.date, slot.hour, other_pos))
 
-    def update_usage(self, constraint_uid: str, delta: int):
-        self.usage_counters[constraint_uid] = self.usage_counters.get(constraint_uid, 0) + delta
+    def resolve_pair(self, slot: Any) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Returns (group_id, other_group_id) for the slot.
+        An explicit other_group_id wins, otherwise the other slot's group is used.
+        """
+        other_gid = self.other_group_id
+        if other_gid is None:
+            other = self.get_other_slot(slot)
+            if other is not None:
+                other_gid = other.group_id
+        return self.group_id, other_gid
@@ -1,7 +1,17 @@
 from dataclasses import dataclass
-from typing import List, Optional
+from datetime import date
+from functools import lru_cache
+from typing import List, Optional, Tuple
 
-@dataclass
+@lru_cache(maxsize=None)
+def _date_ordinal(date_str: str) -> int:
+    return date.fromisoformat(date_str).toordinal()
+
+def hour_index(date_str: str, hour: int) -> int:
+    """Absolute hour number for a date/hour pair, so time gaps are plain integer subtraction."""
+    return _date_ordinal(date_str) * 24 + hour
+
+@dataclass(slots=True)
 class TimeWindow:
     day: int
     start_hour: int
@@ -14,7 +24,7 @@ class TimeWindow:
     def from_dict(data):
         return TimeWindow(data["day"], data["start_hour"], data["end_hour"])
 
-@dataclass
+@dataclass(slots=True)
 class StaffingRule:
     day: int
     start_hour: int
@@ -42,7 +52,7 @@ class StaffingRule:
         if "uid" in data: rule.uid = data["uid"]
         return rule
 
-@dataclass
+@dataclass(slots=True)
 class StaffingException:
     start_date: str
     start_hour: int
@@ -59,6 +69,10 @@ class StaffingException:
             "new_staffing_size": self.new_staffing_size
         }
 
+    def hour_range(self) -> Tuple[int, int]:
+        """Returns the [start, end) range of the exception as absolute hour indices."""
+        return hour_index(self.start_date, self.start_hour), hour_index(self.end_date, self.end_hour)
+
     @staticmethod
     def from_dict(data):
         return StaffingException(
@@ -67,7 +81,7 @@ class StaffingException:
             data["new_staffing_size"]
         )
 
-@dataclass
+@dataclass(slots=True)
 class DateConstraint:
     dates: List[str]
     start_hour: int
@@ -88,7 +102,7 @@ class DateConstraint:
             data["dates"], data["start_hour"], data["end_hour"], data["is_available"]
         )
 
-@dataclass
+@dataclass(slots=True)
 class ScheduleRange:
     start_day: int
     start_hour: int
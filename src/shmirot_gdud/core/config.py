@@ -1,8 +1,10 @@
-from dataclasses import dataclass, asdict
-import json
-import os
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from shmirot_gdud.core import json_io
 
 CONFIG_FILE_NAME = "shmirot_config.json"
+_CONFIG_PATH = Path(CONFIG_FILE_NAME)
 
 @dataclass
 class ScoringConfig:
@@ -23,21 +25,24 @@ class ScoringConfig:
     
     @staticmethod
     def load() -> 'ScoringConfig':
-        if os.path.exists(CONFIG_FILE_NAME):
-            try:
-                with open(CONFIG_FILE_NAME, 'r') as f:
-                    data = json.load(f)
-                return ScoringConfig(**data)
-            except Exception:
-                return ScoringConfig() # Fallback to defaults
-        return ScoringConfig()
+        try:
+            raw = _CONFIG_PATH.read_bytes()
+        except OSError:  # Usually FileNotFoundError: no saved config yet
+            return ScoringConfig()
+        try:
+            data = json_io.loads(raw)
+            return ScoringConfig(**data)
+        except Exception:
+            return ScoringConfig() # Fallback to defaults
 
     def save(self):
         try:
-            with open(CONFIG_FILE_NAME, 'w') as f:
-                json.dump(asdict(self), f, indent=4)
+            # All fields are scalars, so the instance dict is already the serialized form
+            _CONFIG_PATH.write_bytes(json_io.dumps(self.__dict__))
         except Exception as e:
             print(f"Failed to save config: {e}")
 
-# Global instance
-config = ScoringConfig.load()
+@lru_cache(maxsize=None)
+def get_config() -> ScoringConfig:
+    """Returns the global config instance, loading it from disk on first use."""
+    return ScoringConfig.load()
@@ -1,28 +1,15 @@
 from typing import Dict, Any, Type
 from shmirot_gdud.core.base.constraint import ConstraintBase
-from shmirot_gdud.core.constraints.implementations import (
-    UnavailabilityConstraint,
-    ActivityWindowConstraint,
-    DateSpecificConstraint,
-    StaffingRuleConstraint,
-    SimultaneousConstraint,
-    ConsecutiveConstraint,
-    RestConstraint
-)
 
 class ConstraintFactory:
-    _registry: Dict[str, Type[ConstraintBase]] = {
-        "unavailability": UnavailabilityConstraint,
-        "activity_window": ActivityWindowConstraint,
-        "date_specific": DateSpecificConstraint,
-        "staffing_rules": StaffingRuleConstraint,
-        "simultaneous": SimultaneousConstraint,
-        "consecutive": ConsecutiveConstraint,
-        "rest": RestConstraint
-    }
+    # Shared with ConstraintBase, which registers each subclass by TYPE_ID
+    _registry: Dict[str, Type[ConstraintBase]] = ConstraintBase._registry
 
     @classmethod
     def create_from_dict(cls, data: Dict[str, Any]) -> ConstraintBase:
+        if not cls._registry:
+            # Defining the implementations is what registers them
+            import shmirot_gdud.core.constraints.implementations  # noqa: F401
         type_id = data.get("type")
         constraint_class = cls._registry.get(type_id)
         if constraint_class:
@@ -1,20 +1,34 @@
-from typing import List, Dict, Any, Callable, Optional
-from shmirot_gdud.core.base.constraint import ConstraintBase
+from typing import List, Dict, Any, Callable, Optional, Tuple
+from bisect import bisect_left
+from collections import defaultdict
+import sys
+from shmirot_gdud.core.base.constraint import ConstraintBase, new_uid
 from shmirot_gdud.core.base.context import ScheduleContext
-from shmirot_gdud.core.config import config
-import uuid
-from datetime import datetime
+from shmirot_gdud.core.config import get_config
+
+
+def _hour_mask(start: int, end: int) -> int:
+    """Bitmask with bits [start, end) set, one bit per hour of the day."""
+    if end <= start:
+        return 0
+    return (1 << end) - (1 << start)
+
 
 class UnavailabilityConstraint(ConstraintBase):
+    TYPE_ID = "unavailability"
+    DISPLAY_NAME = "ניהול אי-זמינות"
+    IS_HARD = True
+
     def __init__(self, rules: List[Dict[str, int]] = None):
         super().__init__()
         self.rules = rules if rules else []
+        self._rebuild_index()
 
-    def get_type_id(self) -> str:
-        return "unavailability"
-
-    def get_display_name(self) -> str:
-        return "ניהול אי-זמינות"
+    def _rebuild_index(self):
+        # 168-bit mask over the week: bit day*24+hour is set when that hour is blocked
+        self.week_mask = 0
+        for r in self.rules:
+            self.week_mask |= _hour_mask(r['start_hour'], r['end_hour']) << (r['day'] * 24)
 
     def get_status_text(self) -> str:
         return f"{len(self.rules)} חוקים"
@@ -25,27 +39,21 @@ class UnavailabilityConstraint(ConstraintBase):
         windows = [TimeWindow.from_dict(r) for r in self.rules]
         def save_callback(new_windows: List[TimeWindow]):
             self.rules = [w.to_dict() for w in new_windows]
+            self._rebuild_index()
             on_save(self)
         TimeWindowDialog(parent, "ניהול אי-זמינות", windows, save_callback)
 
     def check_validity(self, slot, context: ScheduleContext) -> bool:
-        for r in self.rules:
-            if r['day'] == slot.day_of_week:
-                if r['start_hour'] <= slot.hour < r['end_hour']:
-                    return False
-        return True
+        return not self.week_mask & slot.week_bit
 
     def calculate_score(self, slot, context: ScheduleContext) -> float:
         return 0.0
 
-    def is_hard_constraint(self) -> bool:
-        return True
-
     def validate(self, slot, context) -> bool:
         return self.check_validity(slot, context)
 
     def to_dict(self) -> Dict[str, Any]:
-        return {"type": self.get_type_id(), "rules": self.rules, "uid": self.uid}
+        return {"type": self.TYPE_ID, "rules": self.rules, "uid": self.uid}
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'UnavailabilityConstraint':
@@ -55,15 +63,19 @@ class UnavailabilityConstraint(ConstraintBase):
 
 
 class ActivityWindowConstraint(ConstraintBase):
+    TYPE_ID = "activity_window"
+    DISPLAY_NAME = "חלונות פעילות"
+    IS_HARD = False
+
     def __init__(self, windows: List[Dict[str, int]] = None):
         super().__init__()
         self.windows = windows if windows else []
+        self._rebuild_index()
 
-    def get_type_id(self) -> str:
-        return "activity_window"
-
-    def get_display_name(self) -> str:
-        return "חלונות פעילות"
+    def _rebuild_index(self):
+        self.week_mask = 0
+        for w in self.windows:
+            self.week_mask |= _hour_mask(w['start_hour'], w['end_hour']) << (w['day'] * 24)
 
     def get_status_text(self) -> str:
         return f"{len(self.windows)} חלונות"
@@ -74,6 +86,7 @@ class ActivityWindowConstraint(ConstraintBase):
         windows_objs = [TimeWindow.from_dict(w) for w in self.windows]
         def save_callback(new_windows: List[TimeWindow]):
             self.windows = [w.to_dict() for w in new_windows]
+            self._rebuild_index()
             on_save(self)
         TimeWindowDialog(parent, "ניהול חלונות פעילות", windows_objs, save_callback)
 
@@ -81,20 +94,15 @@ class ActivityWindowConstraint(ConstraintBase):
         return True
 
     def calculate_score(self, slot, context: ScheduleContext) -> float:
-        for w in self.windows:
-            if w['day'] == slot.day_of_week:
-                if w['start_hour'] <= slot.hour < w['end_hour']:
-                    return -config.ACTIVITY_WINDOW_PENALTY
+        if self.week_mask & slot.week_bit:
+            return -get_config().ACTIVITY_WINDOW_PENALTY
         return 0.0
 
-    def is_hard_constraint(self) -> bool:
-        return False
-
     def validate(self, slot, context) -> bool:
         return True
 
     def to_dict(self) -> Dict[str, Any]:
-        return {"type": self.get_type_id(), "windows": self.windows, "uid": self.uid}
+        return {"type": self.TYPE_ID, "windows": self.windows, "uid": self.uid}
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'ActivityWindowConstraint':
@@ -104,15 +112,33 @@ class ActivityWindowConstraint(ConstraintBase):
 
 
 class DateSpecificConstraint(ConstraintBase):
+    TYPE_ID = "date_specific"
+    DISPLAY_NAME = "אילוצי תאריכים"
+    IS_HARD = True
+
     def __init__(self, constraints: List[Dict[str, Any]] = None):
         super().__init__()
         self.constraints = constraints if constraints else []
-
-    def get_type_id(self) -> str:
-        return "date_specific"
-
-    def get_display_name(self) -> str:
-        return "אילוצי תאריכים"
+        self._rebuild_index()
+
+    def _rebuild_index(self):
+        # All rules are folded into one 24-bit mask of blocked hours per date.
+        # Dates with an "available" rule are blocked outside those hours, and
+        # an "unavailable" rule blocks its hours either way.
+        denied = defaultdict(int)
+        allowed: Dict[str, int] = {}
+        for c in self.constraints:
+            mask = _hour_mask(c['start_hour'], c['end_hour'])
+            for d in c['dates']:
+                d = sys.intern(d)
+                if c['is_available']:
+                    allowed[d] = allowed.get(d, 0) | mask
+                else:
+                    denied[d] |= mask
+        self.blocked_by_date: Dict[str, int] = {
+            d: denied.get(d, 0) | (_hour_mask(0, 24) & ~allowed.get(d, _hour_mask(0, 24)))
+            for d in denied.keys() | allowed.keys()
+        }
 
     def get_status_text(self) -> str:
         return f"{len(self.constraints)} אילוצים"
@@ -123,39 +149,21 @@ class DateSpecificConstraint(ConstraintBase):
         objs = [DateConstraint.from_dict(c) for c in self.constraints]
         def save_callback(new_objs: List[DateConstraint]):
             self.constraints = [c.to_dict() for c in new_objs]
+            self._rebuild_index()
             on_save(self)
         DateConstraintDialog(parent, "אילוצי תאריכים", objs, save_callback)
 
     def check_validity(self, slot, context: ScheduleContext) -> bool:
-        date_str = slot.date
-        has_positive = False
-        allowed = False
-        
-        for c in self.constraints:
-            if date_str in c['dates']:
-                if not c['is_available']:
-                    if c['start_hour'] <= slot.hour < c['end_hour']:
-                        return False
-                else:
-                    has_positive = True
-                    if c['start_hour'] <= slot.hour < c['end_hour']:
-                        allowed = True
-        
-        if has_positive:
-            return allowed
-        return True
+        return not (self.blocked_by_date.get(slot.date, 0) >> slot.hour) & 1
 
     def calculate_score(self, slot, context: ScheduleContext) -> float:
         return 0.0
 
-    def is_hard_constraint(self) -> bool:
-        return True
-
     def validate(self, slot, context) -> bool:
         return self.check_validity(slot, context)
 
     def to_dict(self) -> Dict[str, Any]:
-        return {"type": self.get_type_id(), "constraints": self.constraints, "uid": self.uid}
+        return {"type": self.TYPE_ID, "constraints": self.constraints, "uid": self.uid}
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'DateSpecificConstraint':
@@ -165,18 +173,39 @@ class DateSpecificConstraint(ConstraintBase):
 
 
 class StaffingRuleConstraint(ConstraintBase):
+    TYPE_ID = "staffing_rules"
+    DISPLAY_NAME = "חוקי איוש (זוגות/כמות)"
+    IS_HARD = True
+
     def __init__(self, rules: List[Dict[str, Any]] = None):
         super().__init__()
         self.rules = rules if rules else []
         for r in self.rules:
             if 'uid' not in r:
-                r['uid'] = str(uuid.uuid4())
-
-    def get_type_id(self) -> str:
-        return "staffing_rules"
-
-    def get_display_name(self) -> str:
-        return "חוקי איוש (זוגות/כמות)"
+                r['uid'] = new_uid()
+        self._rebuild_index()
+
+    def _rebuild_index(self):
+        # Rules are flattened to (uid, max_capacity, force_coupling) and filed
+        # under each weekly hour bit they cover, so finding the rules at a
+        # slot is one dict lookup on its week_bit
+        by_week_bit: Dict[int, List[Tuple[str, Optional[int], bool]]] = defaultdict(list)
+        # Weekly masks (bit day*24+hour) of the hours any rule covers and of
+        # the hours a coupling rule covers, to skip slots no rule applies to
+        self.week_mask = 0
+        self.coupling_mask = 0
+        for r in self.rules:
+            entry = (r['uid'], r.get('max_capacity'), bool(r.get('force_coupling')))
+            for hour in range(r['start_hour'], r['end_hour']):
+                by_week_bit[1 << (r['day'] * 24 + hour)].append(entry)
+            bits = _hour_mask(r['start_hour'], r['end_hour']) << (r['day'] * 24)
+            self.week_mask |= bits
+            if r.get('force_coupling'):
+                self.coupling_mask |= bits
+        self._by_week_bit = dict(by_week_bit)
+
+    def _rules_at(self, slot) -> List[Tuple[str, Optional[int], bool]]:
+        return self._by_week_bit.get(slot.week_bit, ())
 
     def get_status_text(self) -> str:
         return f"{len(self.rules)} חוקים"
@@ -188,80 +217,72 @@ class StaffingRuleConstraint(ConstraintBase):
         def save_callback(new_objs: List[StaffingRule]):
             self.rules = [r.to_dict() for r in new_objs]
             for r in self.rules:
-                if 'uid' not in r: r['uid'] = str(uuid.uuid4())
+                if 'uid' not in r: r['uid'] = new_uid()
+            self._rebuild_index()
             on_save(self)
         StaffingRulesDialog(parent, "חוקי איוש", objs, save_callback)
 
     def check_validity(self, slot, context: ScheduleContext) -> bool:
-        group_id = context.group_id if hasattr(context, 'group_id') else None
+        group_id = context.group_id
         if not group_id: return True
         
-        other_group_id = getattr(context, 'other_group_id', None)
+        other_group_id = context.other_group_id
+        is_initial_fill = context.is_initial_fill
         
-        for r in self.rules:
-            if r['day'] == slot.day_of_week and r['start_hour'] <= slot.hour < r['end_hour']:
-                
-                if r.get('max_capacity') is not None:
-                    current_usage = context.get_usage(r['uid'])
-                    increment = 1
-                    if getattr(context, 'is_initial_fill', False) and r.get('force_coupling') and other_group_id is None:
-                        increment = 2
-                    if current_usage + increment > r['max_capacity']:
-                        return False
-
-                if r.get('force_coupling'):
-                    if other_group_id is not None and other_group_id != group_id:
-                        return False
+        for uid, max_capacity, force_coupling in self._rules_at(slot):
+            if max_capacity is not None:
+                current_usage = context.usage_counters[uid]
+                increment = 1
+                if is_initial_fill and force_coupling and other_group_id is None:
+                    increment = 2
+                if current_usage + increment > max_capacity:
+                    return False
+
+            if force_coupling:
+                if other_group_id is not None and other_group_id != group_id:
+                    return False
                         
         return True
 
     def calculate_score(self, slot, context: ScheduleContext) -> float:
         score = 0.0
-        for r in self.rules:
-            if r['day'] == slot.day_of_week and r['start_hour'] <= slot.hour < r['end_hour']:
-                if r.get('force_coupling'):
-                    score += config.STAFFING_RULE_BONUS
+        for _, _, force_coupling in self._rules_at(slot):
+            if force_coupling:
+                score += get_config().STAFFING_RULE_BONUS
         return score
 
     def on_assign(self, slot, context: ScheduleContext):
-        for r in self.rules:
-            if r['day'] == slot.day_of_week and r['start_hour'] <= slot.hour < r['end_hour']:
-                context.update_usage(r['uid'], 1)
+        for uid, _, _ in self._rules_at(slot):
+            context.usage_counters[uid] += 1
 
     def on_remove(self, slot, context: ScheduleContext):
-        for r in self.rules:
-            if r['day'] == slot.day_of_week and r['start_hour'] <= slot.hour < r['end_hour']:
-                context.update_usage(r['uid'], -1)
-
-    def is_hard_constraint(self) -> bool:
-        return True
+        for uid, _, _ in self._rules_at(slot):
+            context.usage_counters[uid] -= 1
 
     def validate(self, slot, context) -> bool:
         return self.check_validity(slot, context)
 
     def to_dict(self) -> Dict[str, Any]:
-        return {"type": self.get_type_id(), "rules": self.rules, "uid": self.uid}
+        return {"type": self.TYPE_ID, "rules": self.rules, "uid": self.uid}
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'StaffingRuleConstraint':
+        # __init__ already gives every rule a uid
         c = cls(data.get("rules", []))
         if "uid" in data: c.uid = data["uid"]
-        for r in c.rules:
-            if 'uid' not in r: r['uid'] = str(uuid.uuid4())
         return c
 
 
 class SimultaneousConstraint(ConstraintBase):
+    TYPE_ID = "simultaneous"
+    DISPLAY_NAME = "שמירה כפולה"
+    IS_HARD = True
+    SLOT_LOCAL_SCORE = False
+
     def __init__(self, allowed: bool = True):
         super().__init__()
         self.allowed = allowed
 
-    def get_type_id(self) -> str:
-        return "simultaneous"
-
-    def get_display_name(self) -> str:
-        return "שמירה כפולה"
-
     def get_status_text(self) -> str:
         return "מותר" if self.allowed else "אסור"
 
@@ -272,15 +293,7 @@ class SimultaneousConstraint(ConstraintBase):
         if self.allowed: return True
         
         # If not allowed, check if other slot has same group
-        other = context.get_other_slot(slot)
-        # In improve_schedule, we pass 'other_group_id' in context
-        other_gid = getattr(context, 'other_group_id', None)
-        
-        if other_gid is None and other:
-            other_gid = other.group_id
-            
-        my_gid = getattr(context, 'group_id', None)
-        
+        my_gid, other_gid = context.resolve_pair(slot)
         if other_gid and my_gid and other_gid == my_gid:
             return False
             
@@ -290,26 +303,25 @@ class SimultaneousConstraint(ConstraintBase):
         # Bonus for simultaneous if allowed
         if not self.allowed: return 0.0
         
-        other = context.get_other_slot(slot)
-        other_gid = getattr(context, 'other_group_id', None)
-        if other_gid is None and other:
-            other_gid = other.group_id
-            
-        my_gid = getattr(context, 'group_id', None)
-        
+        my_gid, other_gid = context.resolve_pair(slot)
         if other_gid and my_gid and other_gid == my_gid:
-            return config.SIMULTANEOUS_BONUS
+            return get_config().SIMULTANEOUS_BONUS
             
         return 0.0
 
-    def is_hard_constraint(self) -> bool:
-        return True
+    def calculate_pair_score(self, paired_hours: int) -> float:
+        """
+        Total of calculate_score over a group's slots, given how many hours
+        the group holds at both positions (each of those two slots scores).
+        """
+        if not self.allowed: return 0.0
+        return 2 * paired_hours * get_config().SIMULTANEOUS_BONUS
 
     def validate(self, slot, context) -> bool:
         return self.check_validity(slot, context)
 
     def to_dict(self) -> Dict[str, Any]:
-        return {"type": self.get_type_id(), "allowed": self.allowed}
+        return {"type": self.TYPE_ID, "allowed": self.allowed}
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'SimultaneousConstraint':
@@ -317,15 +329,13 @@ class SimultaneousConstraint(ConstraintBase):
 
 
 class ConsecutiveConstraint(ConstraintBase):
+    TYPE_ID = "consecutive"
+    DISPLAY_NAME = "רצף משמרות"
+    IS_HARD = False
+
     def __init__(self):
         super().__init__()
 
-    def get_type_id(self) -> str:
-        return "consecutive"
-
-    def get_display_name(self) -> str:
-        return "רצף משמרות"
-
     def get_status_text(self) -> str:
         return "פעיל"
 
@@ -353,69 +363,13 @@ class ConsecutiveConstraint(ConstraintBase):
         return 0.0
 
     def calculate_global_score(self, group_slots: List, staffing_size: int, staffing_exceptions: List) -> float:
-        # Logic moved from Group._calculate_sequence_score
-        score = 0.0
-        if not group_slots: return 0.0
-        
-        sorted_slots = sorted(list(group_slots), key=lambda s: (s.date, s.hour))
-        active_hours = sorted(list(set((s.date, s.hour) for s in sorted_slots)))
-        
-        current_seq = 0
-        
-        for i, (date_str, hour) in enumerate(active_hours):
-            dt = datetime.strptime(f"{date_str} {hour}:00", "%Y-%m-%d %H:%M")
-            
-            if i > 0:
-                prev_date, prev_hour = active_hours[i-1]
-                prev_dt = datetime.strptime(f"{prev_date} {prev_hour}:00", "%Y-%m-%d %H:%M")
-                gap_hours = (dt - prev_dt).total_seconds() / 3600
-                
-                if gap_hours == 1.0:
-                    current_seq += 1
-                else:
-                    score += self._evaluate_sequence(current_seq, prev_date, prev_hour, staffing_size, staffing_exceptions)
-                    current_seq = 1
-            else:
-                current_seq = 1
-                
-        if active_hours:
-            last_date, last_hour = active_hours[-1]
-            score += self._evaluate_sequence(current_seq, last_date, last_hour, staffing_size, staffing_exceptions)
-            
-        return score
-
-    def _evaluate_sequence(self, length: int, date_str: str, hour: int, staffing_size: int, exceptions: List) -> float:
-        staffing = staffing_size if staffing_size else 4
-        for exc in exceptions:
-             try:
-                dt = datetime.strptime(f"{date_str} {hour}:00", "%Y-%m-%d %H:%M")
-                start_dt = datetime.strptime(f"{exc.start_date} {exc.start_hour}:00", "%Y-%m-%d %H:%M")
-                end_dt = datetime.strptime(f"{exc.end_date} {exc.end_hour}:00", "%Y-%m-%d %H:%M")
-                if start_dt <= dt < end_dt:
-                    staffing = exc.new_staffing_size
-                    break
-             except: pass
-             
-        max_consecutive = staffing // 2
-        if max_consecutive < 2: max_consecutive = 2
-        if staffing == 2: max_consecutive = 2
-        
-        score = 0
-        if length <= max_consecutive:
-            score += length * config.CONSECUTIVE_BONUS_PER_HOUR
-        else:
-            excess = length - max_consecutive
-            score -= (excess ** config.CONSECUTIVE_PENALTY_EXPONENT) * config.CONSECUTIVE_PENALTY_MULTIPLIER
-        return score
-
-    def is_hard_constraint(self) -> bool:
-        return False
+        return score_group_sequences(sorted(s.hour_index for s in group_slots), staffing_size, staffing_exceptions)[0]
 
     def validate(self, slot, context) -> bool:
         return True
 
     def to_dict(self) -> Dict[str, Any]:
-        return {"type": self.get_type_id()}
+        return {"type": self.TYPE_ID}
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'ConsecutiveConstraint':
@@ -423,15 +377,13 @@ class ConsecutiveConstraint(ConstraintBase):
 
 
 class RestConstraint(ConstraintBase):
+    TYPE_ID = "rest"
+    DISPLAY_NAME = "מנוחה"
+    IS_HARD = False
+
     def __init__(self):
         super().__init__()
 
-    def get_type_id(self) -> str:
-        return "rest"
-
-    def get_display_name(self) -> str:
-        return "מנוחה"
-
     def get_status_text(self) -> str:
         return "פעיל"
 
@@ -445,38 +397,172 @@ class RestConstraint(ConstraintBase):
         return 0.0
 
     def calculate_global_score(self, group_slots: List) -> float:
-        score = 0.0
-        if not group_slots: return 0.0
-        
-        sorted_slots = sorted(list(group_slots), key=lambda s: (s.date, s.hour))
-        active_hours = sorted(list(set((s.date, s.hour) for s in sorted_slots)))
-        
-        for i, (date_str, hour) in enumerate(active_hours):
-            if i > 0:
-                dt = datetime.strptime(f"{date_str} {hour}:00", "%Y-%m-%d %H:%M")
-                prev_date, prev_hour = active_hours[i-1]
-                prev_dt = datetime.strptime(f"{prev_date} {prev_hour}:00", "%Y-%m-%d %H:%M")
-                gap_hours = (dt - prev_dt).total_seconds() / 3600
-                
-                if gap_hours > 1.0:
-                    rest_time = gap_hours - 1
-                    if rest_time < 6:
-                        score -= (6 - rest_time) * config.REST_PENALTY
-                    elif rest_time < 16:
-                        score -= config.SHORT_REST_PENALTY
-                    elif rest_time >= 24:
-                        score += config.LONG_REST_BONUS
-        return score
-
-    def is_hard_constraint(self) -> bool:
-        return False
+        return score_group_sequences(sorted(s.hour_index for s in group_slots), None, ())[1]
 
     def validate(self, slot, context) -> bool:
         return True
 
     def to_dict(self) -> Dict[str, Any]:
-        return {"type": self.get_type_id()}
+        return {"type": self.TYPE_ID}
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'RestConstraint':
         return cls()
+
+
+def _max_consecutive(staffing: int) -> int:
+    """Longest run of hours that still earns the consecutive bonus."""
+    max_consecutive = staffing // 2
+    if max_consecutive < 2: max_consecutive = 2
+    if staffing == 2: max_consecutive = 2
+    return max_consecutive
+
+
+def _evaluate_sequence(length: int, hour_idx: int, staffing_size: int,
+                       exceptions: List[Tuple[int, int, int]]) -> float:
+    staffing = staffing_size if staffing_size else 4
+    for start_idx, end_idx, size in exceptions:
+        if start_idx <= hour_idx < end_idx:
+            staffing = size
+            break
+         
+    max_consecutive = _max_consecutive(staffing)
+    
+    config = get_config()
+    score = 0
+    if length <= max_consecutive:
+        score += length * config.CONSECUTIVE_BONUS_PER_HOUR
+    else:
+        excess = length - max_consecutive
+        score -= (excess ** config.CONSECUTIVE_PENALTY_EXPONENT) * config.CONSECUTIVE_PENALTY_MULTIPLIER
+    return score
+
+
+def parse_staffing_exceptions(staffing_exceptions: List) -> List[Tuple[int, int, int]]:
+    """Resolves staffing exceptions to (start hour index, end hour index, size), skipping bad dates."""
+    parsed_exc = []
+    for exc in staffing_exceptions:
+        try:
+            start_idx, end_idx = exc.hour_range()
+        except ValueError:
+            continue
+        parsed_exc.append((start_idx, end_idx, exc.new_staffing_size))
+    return parsed_exc
+
+
+def _score_rest(gap_hours: int) -> float:
+    # Scores the rest between two runs whose hours are gap_hours apart (gap_hours > 1)
+    rest_time = gap_hours - 1
+    if rest_time < 6:
+        return -(6 - rest_time) * get_config().REST_PENALTY
+    if rest_time < 16:
+        return -get_config().SHORT_REST_PENALTY
+    if rest_time >= 24:
+        return get_config().LONG_REST_BONUS
+    return 0.0
+
+
+def sequence_delta(hours: List[int], hour: int, staffing_size: Optional[int],
+                   parsed_exc: List[Tuple[int, int, int]]) -> Tuple[float, float]:
+    """
+    Change in score_group_sequences' (consecutive_score, rest_score) from adding
+    `hour` to the ascending `hours`, which must not contain it yet.
+    Only the runs next to the hour and the gap it falls into change, so this
+    looks at those instead of walking the whole sequence. The change from
+    removing an hour is minus the delta of adding it back.
+    """
+    i = bisect_left(hours, hour)
+    n = len(hours)
+    before = hours[i - 1] if i > 0 else None
+    after = hours[i] if i < n else None
+    
+    # The hour splits the gap between its neighbours into (up to) two
+    rest = 0.0
+    if before is not None and after is not None:
+        rest -= _score_rest(after - before)
+    
+    # and becomes a run of its own, or joins the run(s) it touches
+    consecutive = 0.0
+    length = 1
+    last = hour
+    if before == hour - 1:
+        run = 1
+        cur = before
+        for k in range(i - 2, -1, -1):
+            v = hours[k]
+            if v == cur - 1:
+                run += 1
+                cur = v
+            elif v != cur:
+                break
+        consecutive -= _evaluate_sequence(run, before, staffing_size, parsed_exc)
+        length += run
+    elif before is not None:
+        rest += _score_rest(hour - before)
+    if after == hour + 1:
+        run = 1
+        cur = after
+        for k in range(i + 1, n):
+            v = hours[k]
+            if v == cur + 1:
+                run += 1
+                cur = v
+            elif v != cur:
+                break
+        consecutive -= _evaluate_sequence(run, cur, staffing_size, parsed_exc)
+        length += run
+        last = cur
+    elif after is not None:
+        rest += _score_rest(after - hour)
+    consecutive += _evaluate_sequence(length, last, staffing_size, parsed_exc)
+    return consecutive, rest
+
+
+def score_group_sequences(hours: List[int], staffing_size: Optional[int],
+                          staffing_exceptions: List) -> Tuple[float, float]:
+    """
+    Scores a group's assigned hours for both ConsecutiveConstraint and RestConstraint.
+    Both look at the same gaps between active hours, so they share one walk.
+    `hours` are the slots' hour indices in ascending order; an hour may repeat
+    when the group holds both positions.
+    Returns (consecutive_score, rest_score).
+    """
+    if not hours: return 0.0, 0.0
+    
+    # Exception bounds don't depend on the sequence, so resolve them once
+    parsed_exc = parse_staffing_exceptions(staffing_exceptions)
+    
+    # First collect the runs as (length, last hour), scoring the rests between them
+    runs = []
+    rest_score = 0.0
+    # A gap of exactly one hour extends the run, anything larger is rest
+    current_seq = 1
+    prev = hours[0]
+    for curr in hours:
+        gap_hours = curr - prev
+        if gap_hours == 1:
+            current_seq += 1
+        elif gap_hours:
+            runs.append((current_seq, prev))
+            current_seq = 1
+            rest_score += _score_rest(gap_hours)
+        prev = curr
+    runs.append((current_seq, prev))
+    
+    consecutive_score = 0.0
+    if parsed_exc:
+        for length, hour_idx in runs:
+            consecutive_score += _evaluate_sequence(length, hour_idx, staffing_size, parsed_exc)
+    else:
+        # Without exceptions every run has the same limit
+        max_consecutive = _max_consecutive(staffing_size if staffing_size else 4)
+        config = get_config()
+        bonus = config.CONSECUTIVE_BONUS_PER_HOUR
+        exponent = config.CONSECUTIVE_PENALTY_EXPONENT
+        multiplier = config.CONSECUTIVE_PENALTY_MULTIPLIER
+        for length, _ in runs:
+            if length <= max_consecutive:
+                consecutive_score += length * bonus
+            else:
+                consecutive_score -= ((length - max_consecutive) ** exponent) * multiplier
+    return consecutive_score, rest_score
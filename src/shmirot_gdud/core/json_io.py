@@ -0,0 +1,17 @@
+from typing import Any
+import json
+
+try:
+    import orjson
+except ImportError:  # Optional, stdlib json is used as a fallback
+    orjson = None
+
+def loads(raw: bytes) -> Any:
+    """Parses JSON from raw file bytes, with orjson when it is installed."""
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+def dumps(data: Any) -> bytes:
+    """Serializes to indented UTF-8 JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
@@ -1,19 +1,30 @@
 from dataclasses import dataclass, field
-from typing import List, Optional, Dict, Any, Set
+from typing import List, Optional, Dict, Any, Set, Tuple
 import random
+import sys
+from bisect import bisect_left
 from shmirot_gdud.core.base.constraint import ConstraintBase
 from shmirot_gdud.core.base.context import ScheduleContext
-from shmirot_gdud.core.basic_models import TimeWindow, StaffingRule, StaffingException, DateConstraint, ScheduleRange
-from shmirot_gdud.core.config import config
-from datetime import datetime, timedelta
+from shmirot_gdud.core.constraints.implementations import (
+    SimultaneousConstraint, ConsecutiveConstraint, RestConstraint,
+    UnavailabilityConstraint, DateSpecificConstraint, StaffingRuleConstraint, score_group_sequences,
+    parse_staffing_exceptions, sequence_delta
+)
+from shmirot_gdud.core.basic_models import TimeWindow, StaffingRule, StaffingException, DateConstraint, ScheduleRange, hour_index
+from datetime import date, datetime, timedelta
+
+# Score charged for each slot a constraint rejects outright (calculate_score returned None)
+INFEASIBLE_PENALTY = 100000
 
 def generate_pastel_color():
-    r = random.randint(180, 255)
-    g = random.randint(180, 255)
-    b = random.randint(180, 255)
+    # One 24-bit draw, each byte folded into the pastel range 180-255
+    v = random.getrandbits(24)
+    r = 180 + (v & 0xFF) % 76
+    g = 180 + ((v >> 8) & 0xFF) % 76
+    b = 180 + (v >> 16) % 76
     return f"#{r:02x}{g:02x}{b:02x}"
 
-@dataclass
+@dataclass(slots=True)
 class Group:
     id: str
     name: str
@@ -28,30 +39,110 @@ class Group:
     _cached_score: Optional[float] = field(default=None, init=False)
     _is_dirty: bool = field(default=True, init=False)
     _assigned_slots: Set['ScheduleSlot'] = field(default_factory=set, init=False)
+    # hour_index of every assigned slot, kept sorted for the sequence scores
+    _assigned_hours: List[int] = field(default_factory=list, init=False)
+    # Hours held at both positions, i.e. repeated entries in _assigned_hours
+    _paired_hours: int = field(default=0, init=False)
+    _hard_constraints: List[ConstraintBase] = field(default_factory=list, init=False)
+    # Running total of slot-local constraint scores over _assigned_slots
+    _local_score_sum: float = field(default=0.0, init=False)
+    _local_sum_dirty: bool = field(default=False, init=False)
+    _incremental_constraints: List[ConstraintBase] = field(default_factory=list, init=False)
+    _contextual_constraints: List[ConstraintBase] = field(default_factory=list, init=False)
+    _pair_constraints: List[SimultaneousConstraint] = field(default_factory=list, init=False)
+    _local_constraints: List[ConstraintBase] = field(default_factory=list, init=False)
+    # Index into score_group_sequences' (consecutive, rest) result per global constraint
+    _global_parts: List[int] = field(default_factory=list, init=False)
+    # Running score_group_sequences result, moved by _add_hour/_remove_hour.
+    # _sequence_exc holds the parsed staffing exceptions it was computed
+    # with, or None when it must be recomputed from scratch.
+    _sequence_parts: List[float] = field(default_factory=lambda: [0.0, 0.0], init=False)
+    _sequence_exc: Optional[List[Tuple[int, int, int]]] = field(default=None, init=False)
+    # Weekly hour masks (bit day*24+hour) merged from the time-window constraints
+    _unavail_mask: int = field(default=0, init=False)
+    _staffing_mask: int = field(default=0, init=False)
+    _coupling_mask: int = field(default=0, init=False)
+    # Date -> 24-bit mask of hours blocked by the date-specific constraints
+    _date_blocked: Dict[str, int] = field(default_factory=dict, init=False)
     
     def __post_init__(self):
-        # Ensure default constraints exist
-        from shmirot_gdud.core.constraints.implementations import SimultaneousConstraint, ConsecutiveConstraint, RestConstraint
+        # Ensure default constraints exist, in one pass over the list
+        seen = set()
+        for c in self.constraints:
+            seen.add(type(c))
+            if isinstance(c, SimultaneousConstraint):
+                c.allowed = self.can_guard_simultaneously # Sync
         
-        # Simultaneous
-        sim_constraint = next((c for c in self.constraints if isinstance(c, SimultaneousConstraint)), None)
-        if not sim_constraint:
+        if SimultaneousConstraint not in seen:
             self.constraints.append(SimultaneousConstraint(self.can_guard_simultaneously))
-        else:
-            sim_constraint.allowed = self.can_guard_simultaneously # Sync
-            
-        # Consecutive
-        if not any(isinstance(c, ConsecutiveConstraint) for c in self.constraints):
+        if ConsecutiveConstraint not in seen:
             self.constraints.append(ConsecutiveConstraint())
-            
-        # Rest
-        if not any(isinstance(c, RestConstraint) for c in self.constraints):
+        if RestConstraint not in seen:
             self.constraints.append(RestConstraint())
 
+        self._partition_constraints()
+
+    def _partition_constraints(self):
+        self._unavail_mask = 0
+        self._staffing_mask = 0
+        self._coupling_mask = 0
+        self._date_blocked = {}
+        for c in self.constraints:
+            if isinstance(c, UnavailabilityConstraint):
+                self._unavail_mask |= c.week_mask
+            elif isinstance(c, DateSpecificConstraint):
+                for d, mask in c.blocked_by_date.items():
+                    self._date_blocked[d] = self._date_blocked.get(d, 0) | mask
+            elif isinstance(c, StaffingRuleConstraint):
+                self._staffing_mask |= c.week_mask
+                self._coupling_mask |= c.coupling_mask
+        # Availability checks only need to visit the hard constraints, and
+        # unavailability and date rules are already covered by the masks
+        self._hard_constraints = [c for c in self.constraints if c.IS_HARD and not isinstance(
+            c, (UnavailabilityConstraint, DateSpecificConstraint))]
+        # Consecutive/Rest score whole sequences; everything else scores per slot.
+        # Slot-local scores are summed as slots come and go, the rest are
+        # rescored over all slots.
+        self._local_constraints = []
+        self._global_parts = []
+        for c in self.constraints:
+            if isinstance(c, ConsecutiveConstraint):
+                self._global_parts.append(0)
+            elif isinstance(c, RestConstraint):
+                self._global_parts.append(1)
+            else:
+                self._local_constraints.append(c)
+        self._incremental_constraints = [c for c in self._local_constraints if c.SLOT_LOCAL_SCORE]
+        # Simultaneous only asks whether the partner slot is ours too, which
+        # the paired-hours count already answers without visiting the slots
+        self._pair_constraints = [c for c in self._local_constraints if isinstance(c, SimultaneousConstraint)]
+        self._contextual_constraints = [c for c in self._local_constraints
+                                        if not c.SLOT_LOCAL_SCORE and not isinstance(c, SimultaneousConstraint)]
+        self._local_sum_dirty = True
+        self._sequence_exc = None
+
+    def add_constraint(self, constraint: ConstraintBase):
+        self.constraints.append(constraint)
+        self._partition_constraints()
+
+    def refresh_constraints(self):
+        """Call after a constraint's rules were edited so cached lookups pick up the change."""
+        self._partition_constraints()
+        self.invalidate_cache()
+
+    def has_staffing_rules_at(self, slot: 'ScheduleSlot') -> bool:
+        return bool(self._staffing_mask & slot.week_bit)
+
+    def requires_coupling(self, slot: 'ScheduleSlot') -> bool:
+        return bool(self._coupling_mask & slot.week_bit)
+
     def __hash__(self):
+        # Not cached on the instance: the GUI reassigns id after creating a
+        # group, and str already caches its own hash
         return hash(self.id)
 
     def __eq__(self, other):
+        if self is other: return True
         if not isinstance(other, Group): return False
         return self.id == other.id
 
@@ -59,9 +150,37 @@ class Group:
         return self.staffing_size is not None or self.weekly_guard_quota is not None
 
     def invalidate_cache(self):
+        # The running slot-local sum stays valid: it only changes through
+        # notify_* and constraint repartitioning, which keep it up to date
+        self._is_dirty = True
+        self._cached_score = None
+
+    def restore_score(self, score: float):
+        """Reinstates a score from get_score after the changes since were undone."""
+        self._cached_score = score
+        self._is_dirty = False
+
+    def reset_assignments(self):
+        """Forgets all assigned slots, e.g. before re-reading a schedule."""
+        self._assigned_slots = set()
+        self._assigned_hours = []
+        self._paired_hours = 0
+        self._local_score_sum = 0.0
+        self._local_sum_dirty = False
+        self._sequence_exc = None
         self._is_dirty = True
         self._cached_score = None
 
+    def _slot_local_score(self, slot: 'ScheduleSlot', context: ScheduleContext) -> float:
+        score = 0.0
+        for constraint in self._incremental_constraints:
+            s = constraint.calculate_score(slot, context)
+            if s is not None:
+                score += s
+            else:
+                score -= INFEASIBLE_PENALTY
+        return score
+
     def get_score(self, context: ScheduleContext) -> float:
         if not self._is_dirty and self._cached_score is not None:
             return self._cached_score
@@ -71,27 +190,36 @@ class Group:
         return self._cached_score
 
     def _calculate_total_score(self, context: ScheduleContext) -> float:
-        score = 0.0
-        from shmirot_gdud.core.constraints.implementations import ConsecutiveConstraint, RestConstraint
-        
         # 1. Local Constraints Score
-        for slot in self._assigned_slots:
-            for constraint in self.constraints:
-                # Skip global constraints here, they are handled below
-                if isinstance(constraint, (ConsecutiveConstraint, RestConstraint)): continue
-                
-                s = constraint.calculate_score(slot, context)
-                if s is not None:
-                    score += s
-                else:
-                    score -= 100000
-
-        # 2. Global Constraints Score
-        for constraint in self.constraints:
-            if isinstance(constraint, ConsecutiveConstraint):
-                score += constraint.calculate_global_score(list(self._assigned_slots), self.staffing_size, self.staffing_exceptions)
-            elif isinstance(constraint, RestConstraint):
-                score += constraint.calculate_global_score(list(self._assigned_slots))
+        if self._local_sum_dirty:
+            self._local_score_sum = sum(self._slot_local_score(slot, context) for slot in self._assigned_slots)
+            self._local_sum_dirty = False
+        score = self._local_score_sum
+        
+        for constraint in self._pair_constraints:
+            score += constraint.calculate_pair_score(self._paired_hours)
+        
+        if self._contextual_constraints:
+            # Score each slot as this group's, against the partner slot's actual group
+            saved = context.group_id, context.other_group_id
+            context.group_id, context.other_group_id = self.id, None
+            for slot in self._assigned_slots:
+                for constraint in self._contextual_constraints:
+                    s = constraint.calculate_score(slot, context)
+                    if s is not None:
+                        score += s
+                    else:
+                        score -= INFEASIBLE_PENALTY
+            context.group_id, context.other_group_id = saved
+
+        # 2. Global Constraints Score (one fused pass over the assigned hours)
+        if self._global_parts:
+            parts = self._sequence_parts
+            if self._sequence_exc is None:
+                parts[:] = score_group_sequences(self._assigned_hours, self.staffing_size, self.staffing_exceptions)
+                self._sequence_exc = parse_staffing_exceptions(self.staffing_exceptions)
+            for i in self._global_parts:
+                score += parts[i]
         
         return score
 
@@ -100,43 +228,79 @@ class Group:
         total_score = 0.0
         context.group_id = self.id 
         
-        from shmirot_gdud.core.constraints.implementations import ConsecutiveConstraint, RestConstraint
-
-        for constraint in self.constraints:
-            # Skip global constraints for local delta estimation if they return 0
-            if isinstance(constraint, (ConsecutiveConstraint, RestConstraint)): continue
-
+        # Global constraints are left out, they score whole sequences
+        for constraint in self._local_constraints:
             score = constraint.calculate_score(slot, context)
             if score is None:
                 return None 
             total_score += score
         return total_score
 
+    def is_blocked_at(self, slot: 'ScheduleSlot') -> bool:
+        """Whether unavailability or date rules rule the slot out, from the masks alone."""
+        if self._unavail_mask & slot.week_bit:
+            return True
+        return bool(self._date_blocked and (self._date_blocked.get(slot.date, 0) >> slot.hour) & 1)
+
     def is_available(self, slot: 'ScheduleSlot', context: ScheduleContext) -> bool:
         context.group_id = self.id
-        for constraint in self.constraints:
-            if constraint.is_hard_constraint():
-                if not constraint.validate(slot, context):
-                    return False
+        if self.is_blocked_at(slot):
+            return False
+        for constraint in self._hard_constraints:
+            if not constraint.check_validity(slot, context):
+                return False
         return True
 
     def notify_assignment(self, slot: 'ScheduleSlot', context: ScheduleContext):
-        self._assigned_slots.add(slot)
-        self.invalidate_cache()
-        
         context.group_id = self.id
+        if slot not in self._assigned_slots:
+            self._assigned_slots.add(slot)
+            self._add_hour(slot.hour_index)
+            self._local_score_sum += self._slot_local_score(slot, context)
+        self._is_dirty = True
+        self._cached_score = None
+        
         for constraint in self.constraints:
             constraint.on_assign(slot, context)
 
     def notify_removal(self, slot: 'ScheduleSlot', context: ScheduleContext):
+        context.group_id = self.id
         if slot in self._assigned_slots:
             self._assigned_slots.remove(slot)
-            self.invalidate_cache()
+            self._remove_hour(slot.hour_index)
+            self._local_score_sum -= self._slot_local_score(slot, context)
+            self._is_dirty = True
+            self._cached_score = None
             
-        context.group_id = self.id
         for constraint in self.constraints:
             constraint.on_remove(slot, context)
 
+    def _add_hour(self, hour_idx: int):
+        hours = self._assigned_hours
+        i = bisect_left(hours, hour_idx)
+        if i < len(hours) and hours[i] == hour_idx:
+            self._paired_hours += 1
+        elif self._sequence_exc is not None:
+            self._shift_sequence_parts(hour_idx, 1)
+        hours.insert(i, hour_idx)
+
+    def _remove_hour(self, hour_idx: int):
+        hours = self._assigned_hours
+        i = bisect_left(hours, hour_idx)
+        del hours[i]
+        if i < len(hours) and hours[i] == hour_idx:
+            self._paired_hours -= 1
+        elif self._sequence_exc is not None:
+            self._shift_sequence_parts(hour_idx, -1)
+
+    def _shift_sequence_parts(self, hour_idx: int, sign: int):
+        # Called with hour_idx absent from _assigned_hours; removing it is
+        # undoing its addition
+        consecutive, rest = sequence_delta(self._assigned_hours, hour_idx, self.staffing_size, self._sequence_exc)
+        parts = self._sequence_parts
+        parts[0] += sign * consecutive
+        parts[1] += sign * rest
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -149,39 +313,37 @@ class Group:
             "color": self.color
         }
 
+    @staticmethod
+    def _migrate_legacy_constraints(data) -> List[ConstraintBase]:
+        # Old files kept each rule list in its own top-level field
+        from shmirot_gdud.core.constraints.factory import ConstraintFactory
+        constraints = []
+        for key, type_id, field_name in (
+            ("hard_unavailability_rules", "unavailability", "rules"),
+            ("primary_activity_windows", "activity_window", "windows"),
+            ("date_constraints", "date_specific", "constraints"),
+            ("staffing_rules", "staffing_rules", "rules"),
+        ):
+            if data.get(key):
+                constraints.append(ConstraintFactory.create_from_dict({
+                    "type": type_id,
+                    field_name: list(data[key])
+                }))
+        return constraints
+
     @staticmethod
     def from_dict(data):
         from shmirot_gdud.core.constraints.factory import ConstraintFactory
         
-        constraints = []
         if "constraints" in data:
+            constraints = []
             for c_data in data["constraints"]:
                 try:
                     constraints.append(ConstraintFactory.create_from_dict(c_data))
                 except ValueError:
                     pass 
         else:
-            # Migration logic
-            if "hard_unavailability_rules" in data and data["hard_unavailability_rules"]:
-                constraints.append(ConstraintFactory.create_from_dict({
-                    "type": "unavailability",
-                    "rules": [r for r in data["hard_unavailability_rules"]]
-                }))
-            if "primary_activity_windows" in data and data["primary_activity_windows"]:
-                constraints.append(ConstraintFactory.create_from_dict({
-                    "type": "activity_window",
-                    "windows": [w for w in data["primary_activity_windows"]]
-                }))
-            if "date_constraints" in data and data["date_constraints"]:
-                constraints.append(ConstraintFactory.create_from_dict({
-                    "type": "date_specific",
-                    "constraints": [c for c in data["date_constraints"]]
-                }))
-            if "staffing_rules" in data and data["staffing_rules"]:
-                constraints.append(ConstraintFactory.create_from_dict({
-                    "type": "staffing_rules",
-                    "rules": [r for r in data["staffing_rules"]]
-                }))
+            constraints = Group._migrate_legacy_constraints(data)
 
         return Group(
             id=data["id"],
@@ -194,7 +356,7 @@ class Group:
             color=data.get("color", generate_pastel_color())
         )
 
-@dataclass
+@dataclass(slots=True)
 class ScheduleSlot:
     date: str
     day_of_week: int
@@ -202,13 +364,29 @@ class ScheduleSlot:
     position: int
     group_id: Optional[str] = None
     is_locked: bool = False
+    hour_index: int = field(init=False, repr=False)
+    # Bit day_of_week*24+hour, to test against the groups' weekly hour masks
+    week_bit: int = field(init=False, repr=False)
+    _key: int = field(init=False, repr=False)
+
+    def __post_init__(self):
+        # Interned dates hash and compare by identity in set/dict lookups
+        self.date = sys.intern(self.date)
+        # Legacy weekday-only slots (see from_dict) have no date; they are
+        # indexed as if on ordinal day 0 so they still hash and compare
+        self.hour_index = hour_index(self.date, self.hour) if self.date else self.hour
+        self.week_bit = 1 << (self.day_of_week * 24 + self.hour)
+        # (date, hour, position) packed into one int; position is 1 or 2
+        self._key = (self.hour_index << 2) | self.position
 
     def __hash__(self):
-        return hash((self.date, self.hour, self.position))
+        return self._key
 
     def __eq__(self, other):
+        # Sets and dicts usually hold the very same slot object
+        if self is other: return True
         if not isinstance(other, ScheduleSlot): return False
-        return (self.date, self.hour, self.position) == (other.date, other.hour, other.position)
+        return self._key == other._key
 
     def to_dict(self):
         return {
@@ -231,33 +409,35 @@ class ScheduleSlot:
             is_locked=data.get("is_locked", False)
         )
 
-@dataclass
+@dataclass(slots=True)
 class Schedule:
     start_date: str
     end_date: str
     slots: List[ScheduleSlot] = field(default_factory=list)
+    # (date, hour, position) -> slot, so lookups don't scan the slot list
+    _index: Dict[Tuple[str, int, int], ScheduleSlot] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._rebuild_index()
+
+    def _rebuild_index(self):
+        self._index = {(s.date, s.hour, s.position): s for s in self.slots}
 
     @staticmethod
     def create_empty(start_date_str: str, end_date_str: str) -> 'Schedule':
-        start = datetime.strptime(start_date_str, "%Y-%m-%d")
-        end = datetime.strptime(end_date_str, "%Y-%m-%d")
+        start = datetime.strptime(start_date_str, "%Y-%m-%d").toordinal()
+        end = datetime.strptime(end_date_str, "%Y-%m-%d").toordinal()
         slots = []
-        current = start
-        while current <= end:
-            py_weekday = current.weekday()
-            our_weekday = (py_weekday + 1) % 7
-            date_str = current.strftime("%Y-%m-%d")
-            for hour in range(24):
-                slots.append(ScheduleSlot(date_str, our_weekday, hour, 1))
-                slots.append(ScheduleSlot(date_str, our_weekday, hour, 2))
-            current += timedelta(days=1)
+        for ordinal in range(start, end + 1):
+            day = date.fromordinal(ordinal)
+            our_weekday = (day.weekday() + 1) % 7
+            date_str = sys.intern(day.isoformat())
+            slots.extend([ScheduleSlot(date_str, our_weekday, hour, position)
+                          for hour in range(24) for position in (1, 2)])
         return Schedule(start_date_str, end_date_str, slots)
 
     def get_slot(self, date: str, hour: int, position: int) -> Optional[ScheduleSlot]:
-        for slot in self.slots:
-            if slot.date == date and slot.hour == hour and slot.position == position:
-                return slot
-        return None
+        return self._index.get((date, hour, position))
 
     def set_slot(self, date: str, hour: int, position: int, group_id: str, lock: bool = False):
         slot = self.get_slot(date, hour, position)
@@ -272,21 +452,29 @@ class Schedule:
             "slots": [s.to_dict() for s in self.slots]
         }
 
+    @staticmethod
+    def _migrate_legacy(data) -> 'Schedule':
+        # Old files stored one week from week_start_date, with slots keyed by day index
+        start = data["week_start_date"]
+        start_dt = datetime.strptime(start, "%Y-%m-%d")
+        end_dt = start_dt + timedelta(days=6)
+        end = end_dt.strftime("%Y-%m-%d")
+        slots_data = data.get("slots", [])
+        # Format each day of the week once instead of once per slot
+        n_days = max([7] + [s_data.get("day", 0) + 1 for s_data in slots_data])
+        day_strs = [(start_dt + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(n_days)]
+        slots = []
+        for s_data in slots_data:
+            day_idx = s_data.get("day", 0)
+            s_data["date"] = day_strs[day_idx]
+            s_data["day_of_week"] = day_idx
+            slots.append(ScheduleSlot.from_dict(s_data))
+        return Schedule(start, end, slots)
+
     @staticmethod
     def from_dict(data):
         if "week_start_date" in data and "start_date" not in data:
-            start = data["week_start_date"]
-            start_dt = datetime.strptime(start, "%Y-%m-%d")
-            end_dt = start_dt + timedelta(days=6)
-            end = end_dt.strftime("%Y-%m-%d")
-            slots = []
-            for s_data in data.get("slots", []):
-                day_idx = s_data.get("day", 0)
-                slot_date = (start_dt + timedelta(days=day_idx)).strftime("%Y-%m-%d")
-                s_data["date"] = slot_date
-                s_data["day_of_week"] = day_idx
-                slots.append(ScheduleSlot.from_dict(s_data))
-            return Schedule(start, end, slots)
+            return Schedule._migrate_legacy(data)
 
         return Schedule(
             start_date=data["start_date"],
@@ -1,37 +1,49 @@
 from typing import List, Dict, Optional, Tuple, Callable, Set, Any
 from .models import Group, Schedule, ScheduleSlot
-from .config import config
+from .config import get_config
 from .base.context import ScheduleContext
 from shmirot_gdud.core.constraints.implementations import StaffingRuleConstraint
+from collections import Counter
 import random
 import math
 import time
-from datetime import datetime, timedelta
+from datetime import date
 
 DISABLED_ID = "DISABLED"
 
+# Simulated annealing: moves tried per mutable slot, and the temperature
+# range (in score units) cooled through geometrically over those moves
+ANNEAL_MOVES_PER_SLOT = 50
+ANNEAL_START_TEMP = 2000.0
+ANNEAL_END_TEMP = 10.0
+
+# The greedy fill depends on the shuffled slot order; it is run this many
+# times and the best scoring fill is kept
+FILL_ATTEMPTS = 10
+
+# The best-improvement sweep pairs each time point with the next this many
+# (a week of hours), so a week is swept in full and longer schedules don't
+# pay for every distant pair
+SWEEP_WINDOW = 168
+
+DEFAULT_HARD_START = 2
+DEFAULT_HARD_END = 6
+
 class ScheduleState:
+    # update_slot runs for every evaluated move, so keep attribute access slotted
+    # like the core dataclasses
+    __slots__ = ('schedule', 'groups', 'hard_start', 'hard_end', 'slot_map', 'group_hard_hours',
+                 'group_daily_counts')
+
     def __init__(self, schedule: Schedule, groups: List[Group], hard_start: int, hard_end: int):
         self.schedule = schedule
         self.groups = {g.id: g for g in groups}
         self.hard_start = hard_start
         self.hard_end = hard_end
         
-        self.slot_map: Dict[Tuple[str, int, int], ScheduleSlot] = {}
-        for s in schedule.slots:
-            self.slot_map[(s.date, s.hour, s.position)] = s
-            
-        start_date = datetime.strptime(schedule.start_date, "%Y-%m-%d")
-        end_date = datetime.strptime(schedule.end_date, "%Y-%m-%d")
-        self.time_points = []
-        curr = start_date
-        while curr <= end_date:
-            d_str = curr.strftime("%Y-%m-%d")
-            for h in range(24):
-                self.time_points.append((d_str, h))
-            curr += timedelta(days=1)
-            
-        self.time_to_index = {t: i for i, t in enumerate(self.time_points)}
+        # Scoring walks the slots themselves, so no calendar of time points is built
+        self.slot_map: Dict[Tuple[str, int, int], ScheduleSlot] = {
+            (s.date, s.hour, s.position): s for s in schedule.slots}
         
         self.group_hard_hours = {g_id: 0 for g_id in self.groups}
         self.group_daily_counts = {} 
@@ -69,121 +81,46 @@ class ScheduleState:
             key = (new_group_id, slot.date)
             self.group_daily_counts[key] = self.group_daily_counts.get(key, 0) + 1
 
-    def get_staffing_at(self, group: Group, date_str: str, hour: int) -> int:
-        for exc in group.staffing_exceptions:
-            try:
-                dt = datetime.strptime(f"{date_str} {hour}:00", "%Y-%m-%d %H:%M")
-                start_dt = datetime.strptime(f"{exc.start_date} {exc.start_hour}:00", "%Y-%m-%d %H:%M")
-                end_dt = datetime.strptime(f"{exc.end_date} {exc.end_hour}:00", "%Y-%m-%d %H:%M")
-                if start_dt <= dt < end_dt:
-                    return exc.new_staffing_size
-            except ValueError:
-                pass
-        return group.staffing_size if group.staffing_size is not None else 4 
-
-    def get_group_consecutive_score(self, group_id: str) -> float:
-        if group_id == DISABLED_ID: return 0
-        group = self.groups.get(group_id)
-        if not group: return 0
-        
-        score = 0
-        current_seq = 0
-        last_active_idx = -999
-        
-        for idx, (date_str, hour) in enumerate(self.time_points):
-            current_staffing = self.get_staffing_at(group, date_str, hour)
-            
-            if current_staffing <= 2:
-                desired_seq = 2
-            else:
-                desired_seq = max(2, current_staffing // 2)
-            
-            is_active = False
-            for pos in [1, 2]:
-                s = self.slot_map.get((date_str, hour, pos))
-                if s and s.group_id == group_id:
-                    is_active = True
-                    break
-            
-            s_ref = self.slot_map.get((date_str, hour, 1))
-            day_of_week = s_ref.day_of_week if s_ref else 0
-            
-            from shmirot_gdud.core.constraints.implementations import ActivityWindowConstraint
-            for c in group.constraints:
-                if isinstance(c, ActivityWindowConstraint):
-                    for w in c.windows:
-                        if w['day'] == day_of_week and w['start_hour'] <= hour < w['end_hour']:
-                            is_active = True
-                            break
-            
-            if is_active:
-                if current_seq == 0 and last_active_idx != -999:
-                    rest_time = idx - last_active_idx - 1
-                    
-                    if rest_time < 6:
-                        score -= (6 - rest_time) * config.REST_PENALTY
-                    elif rest_time < 16:
-                        score -= config.SHORT_REST_PENALTY
-                    elif rest_time >= 24:
-                        score += config.LONG_REST_BONUS
-                
-                current_seq += 1
-                last_active_idx = idx
-            else:
-                if current_seq > 0:
-                    if current_seq <= desired_seq:
-                        score += (current_seq * config.CONSECUTIVE_BONUS_PER_HOUR)
-                    else:
-                        excess = current_seq - desired_seq
-                        score -= (excess ** config.CONSECUTIVE_PENALTY_EXPONENT) * config.CONSECUTIVE_PENALTY_MULTIPLIER
-                    
-                    current_seq = 0
-                    
-        return score
-
     def get_simultaneous_score(self) -> float:
+        # One pass over the first positions, each compared with its partner
         score = 0
-        for date_str, hour in self.time_points:
-            s1 = self.slot_map.get((date_str, hour, 1))
-            s2 = self.slot_map.get((date_str, hour, 2))
-            
-            if s1 and s2 and s1.group_id and s2.group_id:
-                if s1.group_id != DISABLED_ID and s2.group_id != DISABLED_ID:
-                    if s1.group_id == s2.group_id:
-                        score += config.SIMULTANEOUS_BONUS
+        slot_map = self.slot_map
+        bonus = get_config().SIMULTANEOUS_BONUS
+        for (date_str, hour, position), s1 in slot_map.items():
+            if position != 1: continue
+            gid = s1.group_id
+            if not gid or gid == DISABLED_ID: continue
+            s2 = slot_map.get((date_str, hour, 2))
+            if s2 is not None and s2.group_id == gid:
+                score += bonus
         return score
 
 class Scheduler:
-    def __init__(self, groups: List[Group]):
+    def __init__(self, groups: List[Group], seed: Optional[int] = None):
         self.groups = groups
+        # Own generator so a seed reproduces a run without touching the global one
+        self._rng = random.Random(seed)
+        # Empty and DISABLED ids are left out, so looking them up gives None
+        self._group_by_id: Dict[str, Group] = {g.id: g for g in groups if g.id and g.id != DISABLED_ID}
+        # Groups with a staffing size or quota, the only ones fill_schedule assigns
+        self._available_groups: List[Group] = [g for g in groups if g.validate()]
         self.schedule: Optional[Schedule] = None
         self.context: Optional[ScheduleContext] = None
         self.rule_usage = {} 
 
     def _get_group(self, group_id: Optional[str]) -> Optional[Group]:
-        if not group_id or group_id == DISABLED_ID: return None
-        return next((g for g in self.groups if g.id == group_id), None)
+        return self._group_by_id.get(group_id)
 
     def fill_schedule(self, schedule: Schedule) -> Schedule:
         self.schedule = schedule
         
         # Initialize Context
-        self.context = ScheduleContext(slot_map={})
-        for s in self.schedule.slots:
-            self.context.slot_map[(s.date, s.hour, s.position)] = s
+        self.context = ScheduleContext(slot_map={(s.date, s.hour, s.position): s for s in self.schedule.slots})
             
         # Initialize usage counters from existing assignments
-        self.context.usage_counters = {}
-        self.rule_usage = {}
-        
-        for s in self.schedule.slots:
-            if s.group_id and s.group_id != DISABLED_ID:
-                group = self._get_group(s.group_id)
-                if group:
-                    group.notify_assignment(s, self.context)
-                    self._update_usage_for_slot(s, group, 1)
+        self._sync_groups()
 
-        available_groups = [g for g in self.groups if g.validate()]
+        available_groups = self._available_groups
         if not available_groups: return self.schedule
 
         empty_slots = [s for s in self.schedule.slots if s.group_id is None]
@@ -193,9 +130,8 @@ class Scheduler:
 
         total_slots_to_fill = len(empty_slots)
         
-        start_date = datetime.strptime(self.schedule.start_date, "%Y-%m-%d")
-        end_date = datetime.strptime(self.schedule.end_date, "%Y-%m-%d")
-        days_diff = (end_date - start_date).days + 1
+        days_diff = (date.fromisoformat(self.schedule.end_date).toordinal()
+                     - date.fromisoformat(self.schedule.start_date).toordinal() + 1)
         weeks_ratio = days_diff / 7.0
         
         fixed_quota_groups = [g for g in available_groups if g.weekly_guard_quota is not None]
@@ -227,7 +163,32 @@ class Scheduler:
             if proportional_groups: group_targets[proportional_groups[0].id] += diff
             elif fixed_quota_groups: group_targets[fixed_quota_groups[0].id] += diff
 
-        random.shuffle(empty_slots)
+        best_score = None
+        best_assignment = None
+        for attempt in range(FILL_ATTEMPTS):
+            if attempt:
+                for s in empty_slots: s.group_id = None
+                self._sync_groups()
+            
+            order = list(empty_slots)
+            self._rng.shuffle(order)
+            self._greedy_fill(order, available_groups, dict(current_counts), group_targets)
+            
+            state = ScheduleState(self.schedule, self.groups, DEFAULT_HARD_START, DEFAULT_HARD_END)
+            score = self._calculate_global_score(state)
+            if best_score is None or score > best_score:
+                best_score = score
+                best_assignment = [s.group_id for s in empty_slots]
+        
+        if any(s.group_id != gid for s, gid in zip(empty_slots, best_assignment)):
+            for s, gid in zip(empty_slots, best_assignment):
+                s.group_id = gid
+            self._sync_groups()
+        
+        return self.schedule
+
+    def _greedy_fill(self, empty_slots: List[ScheduleSlot], available_groups: List[Group],
+                     current_counts: Dict[str, int], group_targets: Dict[str, int]):
         filled_in_loop = set()
 
         for slot in empty_slots:
@@ -259,8 +220,6 @@ class Scheduler:
                 else:
                     self._assign_slot(slot, selected_group)
                     current_counts[selected_group.id] += 1
-        
-        return self.schedule
 
     def _assign_slot(self, slot: ScheduleSlot, group: Group):
         slot.group_id = group.id
@@ -268,6 +227,7 @@ class Scheduler:
         self._update_usage_for_slot(slot, group, 1)
 
     def _update_usage_for_slot(self, slot: ScheduleSlot, group: Group, delta: int):
+        if not group.has_staffing_rules_at(slot): return
         for c_idx, constraint in enumerate(group.constraints):
             if isinstance(constraint, StaffingRuleConstraint):
                 for r_idx, r in enumerate(constraint.rules):
@@ -276,25 +236,23 @@ class Scheduler:
                         self.rule_usage[key] = self.rule_usage.get(key, 0) + delta
 
     def _check_coupling_requirement(self, group: Group, slot: ScheduleSlot) -> bool:
-        for constraint in group.constraints:
-            if isinstance(constraint, StaffingRuleConstraint):
-                for r in constraint.rules:
-                    if r['day'] == slot.day_of_week and r['start_hour'] <= slot.hour < r['end_hour']:
-                        if r.get('force_coupling'):
-                            return True
-        return False
+        return group.requires_coupling(slot)
 
     def _select_best_group(self, slot: ScheduleSlot, groups: List[Group], current_counts: Dict[str, int], targets: Dict[str, int]) -> Optional[Group]:
-        candidates = []
+        # Only the top candidate is needed, so keep a running best instead of
+        # sorting; the strict > keeps the first group on ties, as the stable sort did
+        best_group = None
+        best_score = float('-inf')
+        other_group_id = self.context.other_group_id
         
         for g in groups:
+            # Cheapest rejection first: the group already holds the partner slot
+            if other_group_id == g.id and not g.can_guard_simultaneously: continue
+            
             if not g.is_available(slot, self.context): continue
             
             # Check staffing rules manually for initial fill (capacity/coupling)
-            if not self._check_staffing_rules_initial(g, slot, self.context.other_group_id): continue
-            
-            other_group_id = getattr(self.context, 'other_group_id', None)
-            if other_group_id == g.id and not g.can_guard_simultaneously: continue
+            if not self._check_staffing_rules_initial(g, slot, other_group_id): continue
             
             score = 0
             target = targets.get(g.id, 0)
@@ -308,13 +266,14 @@ class Scheduler:
             
             if other_group_id == g.id and g.can_guard_simultaneously: score += 50
             
-            candidates.append((score, g))
+            if score > best_score:
+                best_group = g
+                best_score = score
             
-        candidates.sort(key=lambda x: x[0], reverse=True)
-        if candidates: return candidates[0][1]
-        return None
+        return best_group
 
     def _check_staffing_rules_initial(self, group: Group, slot: ScheduleSlot, other_group_id: Optional[str]) -> bool:
+        if not group.has_staffing_rules_at(slot): return True
         for c_idx, constraint in enumerate(group.constraints):
             if isinstance(constraint, StaffingRuleConstraint):
                 for r_idx, r in enumerate(constraint.rules):
@@ -331,8 +290,29 @@ class Scheduler:
                                 return False
         return True
 
-    def improve_schedule(self, hard_start: int = 2, hard_end: int = 6, progress_callback: Optional[Callable[[float], None]] = None) -> Schedule:
-        print("Starting improve_schedule (Best Improvement)...")
+    def _sync_groups(self):
+        # Drop slots a previous schedule left behind in the groups and
+        # rebuild their assignments and rule usage from the schedule
+        self.rule_usage = {}
+        self.context.usage_counters = Counter()
+        for g in self.groups:
+            g.reset_assignments()
+            
+        # Loaded schedules hold their own copies of the id strings. Pointing
+        # each slot at the group's own id object (and at DISABLED_ID) lets
+        # the many id comparisons and lookups below succeed on identity.
+        for s in self.schedule.slots:
+            if s.group_id == DISABLED_ID:
+                s.group_id = DISABLED_ID
+            elif s.group_id:
+                group = self._get_group(s.group_id)
+                if group:
+                    s.group_id = group.id
+                    group.notify_assignment(s, self.context)
+                    self._update_usage_for_slot(s, group, 1)
+
+    def improve_schedule(self, hard_start: int = DEFAULT_HARD_START, hard_end: int = DEFAULT_HARD_END, progress_callback: Optional[Callable[[float], None]] = None) -> Schedule:
+        print("Starting improve_schedule (Annealing + Best Improvement)...")
         start_time = time.time()
         
         if not self.schedule or not self.schedule.slots: return self.schedule
@@ -341,21 +321,9 @@ class Scheduler:
         if len(mutable_slots) < 2: return self.schedule
 
         # Initialize
-        self.context = ScheduleContext(slot_map={})
-        for s in self.schedule.slots:
-            self.context.slot_map[(s.date, s.hour, s.position)] = s
-            
-        self.rule_usage = {}
-        for g in self.groups:
-            g.invalidate_cache()
-            g._assigned_slots = set() 
+        self.context = ScheduleContext(slot_map={(s.date, s.hour, s.position): s for s in self.schedule.slots})
             
-        for s in self.schedule.slots:
-            if s.group_id and s.group_id != DISABLED_ID:
-                group = self._get_group(s.group_id)
-                if group:
-                    group.notify_assignment(s, self.context)
-                    self._update_usage_for_slot(s, group, 1)
+        self._sync_groups()
 
         state = ScheduleState(self.schedule, self.groups, hard_start, hard_end)
         
@@ -370,47 +338,49 @@ class Scheduler:
         current_total_score = self._calculate_global_score(state)
         print(f"Initial Score: {current_total_score}")
         
+        # Anneal first to get out of the fill's local optimum, then finish
+        # with a best-improvement sweep from the best schedule it found
+        if len(time_keys) >= 2:
+            current_total_score, state = self._anneal(
+                mutable_slots, slots_by_time, time_keys, current_total_score, state, progress_callback)
+        
         num_times = len(time_keys)
+        slot_lists = [slots_by_time[k] for k in time_keys]
+        evaluate_move = self._evaluate_move
         
         for i in range(num_times):
             t1_key = time_keys[i]
-            slots1 = slots_by_time[t1_key]
+            slots1 = slot_lists[i]
             
             if progress_callback:
-                p = (i / num_times) * 100
+                p = 50 + (i / num_times) * 50
                 progress_callback(p)
             
             best_move = None 
             best_score_diff = 0
             
-            for j in range(i + 1, num_times):
-                t2_key = time_keys[j]
-                slots2 = slots_by_time[t2_key]
-                
+            for slots2 in slot_lists[i + 1:i + 1 + SWEEP_WINDOW]:
                 moves = []
                 
+                # Moves that would swap a group with itself are left out
                 # 1. Block Swap
                 if len(slots1) == 2 and len(slots2) == 2:
-                    moves.append(('block', [(slots1[0], slots2[0]), (slots1[1], slots2[1])]))
+                    a1, a2 = slots1
+                    b1, b2 = slots2
+                    if a1.group_id != b1.group_id or a2.group_id != b2.group_id:
+                        moves.append(('block', [(a1, b1), (a2, b2)]))
                 
                 # 2. Single Swaps
                 for s1 in slots1:
                     for s2 in slots2:
-                        moves.append(('single', [(s1, s2)]))
+                        if s1.group_id != s2.group_id:
+                            moves.append(('single', [(s1, s2)]))
                 
                 for move_type, swap_pairs in moves:
-                    if self._try_apply_move(swap_pairs):
-                        new_score = self._calculate_global_score(state)
-                        diff = new_score - current_total_score
-                        
-                        if diff > best_score_diff:
-                            best_score_diff = diff
-                            best_move = (move_type, swap_pairs)
-                        
-                        self._revert_move(swap_pairs)
-                        for s1, s2 in swap_pairs:
-                            state.update_slot(s1, s1.group_id)
-                            state.update_slot(s2, s2.group_id)
+                    diff = evaluate_move(swap_pairs, state)
+                    if diff is not None and diff > best_score_diff:
+                        best_score_diff = diff
+                        best_move = (move_type, swap_pairs)
 
             if best_move:
                 move_type, swap_pairs = best_move
@@ -423,11 +393,134 @@ class Scheduler:
         print(f"Finished in {time.time() - start_time:.2f}s. Final Score: {current_total_score}")
         return self.schedule
 
+    def _anneal(self, mutable_slots: List[ScheduleSlot], slots_by_time: Dict[Tuple[str, int], List[ScheduleSlot]],
+                time_keys: List[Tuple[str, int]], current_total_score: float, state: ScheduleState,
+                progress_callback: Optional[Callable[[float], None]]) -> Tuple[float, ScheduleState]:
+        # Moves are swaps only: they keep every group's slot count, so the
+        # quotas set by fill_schedule survive
+        iterations = ANNEAL_MOVES_PER_SLOT * len(mutable_slots)
+        temp = ANNEAL_START_TEMP
+        alpha = (ANNEAL_END_TEMP / ANNEAL_START_TEMP) ** (1 / iterations)
+        report_every = max(1, iterations // 50)
+        
+        best_score = current_total_score
+        best_assignment = [s.group_id for s in mutable_slots]
+        
+        slot_lists = [slots_by_time[k] for k in time_keys]
+        num_times = len(slot_lists)
+        rng = self._rng
+        # Bound once, the loop body runs tens of thousands of times
+        evaluate_move = self._evaluate_move
+        apply_move = self._apply_move_permanent
+        exp = math.exp
+        random_draw = rng.random
+        
+        # Every per-move choice is drawn up front: two distinct time points
+        # (the second index skips over the first), block vs. single swap, and
+        # the position taken at each time point for a single swap
+        firsts = rng.choices(range(num_times), k=iterations)
+        seconds = rng.choices(range(num_times - 1), k=iterations)
+        blocks = rng.choices((True, False), k=iterations)
+        picks1 = rng.choices((0, 1), k=iterations)
+        picks2 = rng.choices((0, 1), k=iterations)
+        
+        for it, i, j, block, p1, p2 in zip(range(iterations), firsts, seconds, blocks, picks1, picks2):
+            if progress_callback and it % report_every == 0:
+                progress_callback((it / iterations) * 50)
+            
+            if j >= i: j += 1
+            slots1 = slot_lists[i]
+            slots2 = slot_lists[j]
+            
+            temp *= alpha
+            # Moves that would swap a group with itself are skipped
+            if block and len(slots1) == 2 and len(slots2) == 2:
+                a1, a2 = slots1
+                b1, b2 = slots2
+                if a1.group_id == b1.group_id and a2.group_id == b2.group_id: continue
+                swap_pairs = [(a1, b1), (a2, b2)]
+            else:
+                # A time point holds one or two mutable slots
+                a1 = slots1[p1 % len(slots1)]
+                b1 = slots2[p2 % len(slots2)]
+                if a1.group_id == b1.group_id: continue
+                swap_pairs = [(a1, b1)]
+            
+            diff = evaluate_move(swap_pairs, state)
+            if diff is None: continue
+            
+            # Metropolis: always take improvements, take a loss with probability exp(diff / T)
+            if diff >= 0 or exp(diff / temp) > random_draw():
+                apply_move(swap_pairs, state)
+                current_total_score += diff
+                
+                if current_total_score > best_score:
+                    best_score = current_total_score
+                    best_assignment = [s.group_id for s in mutable_slots]
+        
+        print(f"  Annealing: {current_total_score} (best {best_score})")
+        
+        if best_score > current_total_score:
+            for s, gid in zip(mutable_slots, best_assignment):
+                s.group_id = gid
+            self._sync_groups()
+            state = ScheduleState(self.schedule, self.groups, state.hard_start, state.hard_end)
+            current_total_score = best_score
+        
+        return current_total_score, state
+
+    def _evaluate_move(self, swap_pairs: List[Tuple[ScheduleSlot, ScheduleSlot]], state: ScheduleState) -> Optional[float]:
+        # Returns the score change of a move without keeping it, or None if it is not valid.
+        # Only the swapped groups and hours can change score, so the move is
+        # scored as a delta over them
+        old_scores = {}
+        for pair in swap_pairs:
+            for s in pair:
+                g = self._get_group(s.group_id)
+                if g and g not in old_scores:
+                    old_scores[g] = g.get_score(self.context)
+        # One slot per touched hour; its partner comes from the context's index
+        hour_slots = list({s.hour_index: s for pair in swap_pairs for s in pair}.values())
+        old_sim = sum(self._simultaneous_score_at(s) for s in hour_slots)
+        
+        diff = None
+        if self._try_apply_move(swap_pairs):
+            diff = sum(self._simultaneous_score_at(s) for s in hour_slots) - old_sim
+            for g, old in old_scores.items():
+                diff += g.get_score(self.context) - old
+            
+            self._revert_move(swap_pairs)
+            for s1, s2 in swap_pairs:
+                state.update_slot(s1, s1.group_id)
+                state.update_slot(s2, s2.group_id)
+            
+        # The move is undone either way, so the old scores are current again
+        for g, old in old_scores.items():
+            g.restore_score(old)
+        return diff
+
+    def _simultaneous_score_at(self, slot: ScheduleSlot) -> float:
+        # SIMULTANEOUS_BONUS when the slot and its partner at the same hour hold the same group
+        gid = slot.group_id
+        if not gid or gid == DISABLED_ID: return 0
+        other = self.context.get_other_slot(slot)
+        if other is not None and other.group_id == gid:
+            return get_config().SIMULTANEOUS_BONUS
+        return 0
+
     def _try_apply_move(self, swap_pairs: List[Tuple[ScheduleSlot, ScheduleSlot]]) -> bool:
+        # Groups are resolved once; slot group ids only change in the apply step
+        moves = [(s1, s2, self._get_group(s1.group_id), self._get_group(s2.group_id))
+                 for s1, s2 in swap_pairs]
+        
+        # Blocked hours reject a move from the masks alone, before any
+        # group is notified and then has to be restored
+        for s1, s2, g1, g2 in moves:
+            if g1 and g1.is_blocked_at(s2): return False
+            if g2 and g2.is_blocked_at(s1): return False
+        
         # Decrement usage
-        for s1, s2 in swap_pairs:
-            g1 = self._get_group(s1.group_id)
-            g2 = self._get_group(s2.group_id)
+        for s1, s2, g1, g2 in moves:
             if g1: 
                 g1.notify_removal(s1, self.context)
                 self._update_usage_for_slot(s1, g1, -1)
@@ -435,56 +528,18 @@ class Scheduler:
                 g2.notify_removal(s2, self.context)
                 self._update_usage_for_slot(s2, g2, -1)
             
-        # Check validity
+        # Check validity: s1 will get g2, s2 will get g1
         valid = True
-        
-        for s1, s2 in swap_pairs:
-            # s1 will get g2, s2 will get g1
-            g1 = self._get_group(s1.group_id) # Original group at s1
-            g2 = self._get_group(s2.group_id) # Original group at s2
-            
-            # Check g1 at s2
-            if g1:
-                # Need to know what's in other_s2 AFTER swap
-                other_s2 = self.context.get_other_slot(s2)
-                other_gid_at_s2 = other_s2.group_id if other_s2 else None
-                
-                # If other_s2 is part of swap (block swap), find its new group
-                for swap_a, swap_b in swap_pairs:
-                    if other_s2 == swap_a: other_gid_at_s2 = swap_b.group_id
-                    elif other_s2 == swap_b: other_gid_at_s2 = swap_a.group_id
-                
-                self.context.other_group_id = other_gid_at_s2
-                self.context.group_id = g1.id
-                
-                if not g1.is_available(s2, self.context): valid = False
-                if not self._check_staffing_rules_swap(g1, s1, s2): valid = False
-
-            # Check g2 at s1
-            if g2:
-                other_s1 = self.context.get_other_slot(s1)
-                other_gid_at_s1 = other_s1.group_id if other_s1 else None
-                
-                for swap_a, swap_b in swap_pairs:
-                    if other_s1 == swap_a: other_gid_at_s1 = swap_b.group_id
-                    elif other_s1 == swap_b: other_gid_at_s1 = swap_a.group_id
-                
-                self.context.other_group_id = other_gid_at_s1
-                self.context.group_id = g2.id
-                
-                if not g2.is_available(s1, self.context): valid = False
-                if not self._check_staffing_rules_swap(g2, s2, s1): valid = False
+        for s1, s2, g1, g2 in moves:
+            if (g1 and not self._can_move_to(g1, s1, s2, swap_pairs)) or \
+                    (g2 and not self._can_move_to(g2, s2, s1, swap_pairs)):
+                valid = False
+                break
         
         if valid:
             # Apply swap
-            for s1, s2 in swap_pairs:
-                g1_id = s1.group_id
-                g2_id = s2.group_id
-                s1.group_id = g2_id
-                s2.group_id = g1_id
-                
-                g1 = self._get_group(g1_id)
-                g2 = self._get_group(g2_id)
+            for s1, s2, g1, g2 in moves:
+                s1.group_id, s2.group_id = s2.group_id, s1.group_id
                 if g1: 
                     g1.notify_assignment(s2, self.context)
                     self._update_usage_for_slot(s2, g1, 1)
@@ -494,9 +549,7 @@ class Scheduler:
             return True
         else:
             # Restore usage (Revert removal)
-            for s1, s2 in swap_pairs:
-                g1 = self._get_group(s1.group_id)
-                g2 = self._get_group(s2.group_id)
+            for s1, s2, g1, g2 in moves:
                 if g1: 
                     g1.notify_assignment(s1, self.context)
                     self._update_usage_for_slot(s1, g1, 1)
@@ -505,6 +558,23 @@ class Scheduler:
                     self._update_usage_for_slot(s2, g2, 1)
             return False
 
+    def _can_move_to(self, group: Group, source: ScheduleSlot, target: ScheduleSlot,
+                     swap_pairs: List[Tuple[ScheduleSlot, ScheduleSlot]]) -> bool:
+        # Need to know what's in the target's partner slot AFTER the swap
+        other = self.context.get_other_slot(target)
+        other_gid = other.group_id if other else None
+        
+        # If the partner is part of the swap (block swap), find its new group
+        for swap_a, swap_b in swap_pairs:
+            if other == swap_a: other_gid = swap_b.group_id
+            elif other == swap_b: other_gid = swap_a.group_id
+        
+        self.context.other_group_id = other_gid
+        self.context.group_id = group.id
+        
+        if not group.is_available(target, self.context): return False
+        return self._check_staffing_rules_swap(group, source, target)
+
     def _revert_move(self, swap_pairs: List[Tuple[ScheduleSlot, ScheduleSlot]]):
         for s1, s2 in swap_pairs:
             g2 = self._get_group(s1.group_id) # Currently at s1
@@ -557,6 +627,7 @@ class Scheduler:
             state.update_slot(s2, s2.group_id)
 
     def _check_staffing_rules_swap(self, group: Group, source_slot: ScheduleSlot, target_slot: ScheduleSlot) -> bool:
+        if not group.has_staffing_rules_at(target_slot): return True
         for c_idx, constraint in enumerate(group.constraints):
             if isinstance(constraint, StaffingRuleConstraint):
                 for r_idx, r in enumerate(constraint.rules):
@@ -573,7 +644,7 @@ class Scheduler:
                         if r.get('force_coupling'):
                             if not group.can_guard_simultaneously: return False
                             other = self.context.get_other_slot(target_slot)
-                            other_gid = getattr(self.context, 'other_group_id', None)
+                            other_gid = self.context.other_group_id
                             if other_gid is None and other: other_gid = other.group_id
                             
                             if other_gid != group.id:
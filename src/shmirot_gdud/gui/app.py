@@ -1,6 +1,5 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import json
 from typing import List, Dict, Optional
 import pandas as pd
 from openpyxl.styles import PatternFill, Alignment
@@ -8,7 +7,8 @@ from datetime import datetime, timedelta
 
 from shmirot_gdud.core.models import Group, Schedule, ScheduleRange, ScheduleSlot
 from shmirot_gdud.core.scheduler import Scheduler
-from shmirot_gdud.core.config import config
+from shmirot_gdud.core.config import get_config
+from shmirot_gdud.core import json_io
 from shmirot_gdud.core.constraints.factory import ConstraintFactory
 from shmirot_gdud.core.constraints.implementations import UnavailabilityConstraint, ActivityWindowConstraint, DateSpecificConstraint, StaffingRuleConstraint
 from shmirot_gdud.gui.dialogs import GroupCreationDialog, DateRangeDialog, ImprovementSettingsDialog, AdvancedSettingsDialog, StaffingExceptionsDialog
@@ -21,7 +21,7 @@ class App:
         self.root.title(bidi_text("מערכת שיבוץ שמירות גדודית"))
         self.root.geometry("1400x800")
 
-        config.save()
+        get_config().save()
 
         self.groups: List[Group] = []
         self.schedule: Optional[Schedule] = None
@@ -178,9 +178,10 @@ class App:
         constraint = next((c for c in group.constraints if isinstance(c, constraint_class)), None)
         if not constraint:
             constraint = constraint_class()
-            group.constraints.append(constraint)
+            group.add_constraint(constraint)
             
         def on_save(updated_constraint):
+            group.refresh_constraints()
             # Update status label
             if constraint_class in self.constraint_labels:
                 self.constraint_labels[constraint_class].config(text=bidi_text(updated_constraint.get_status_text()))
@@ -467,16 +468,16 @@ class App:
         filename = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON files", "*.json")])
         if filename:
             data = [g.to_dict() for g in self.groups]
-            with open(filename, 'w') as f:
-                json.dump(data, f, indent=2)
+            with open(filename, 'wb') as f:
+                f.write(json_io.dumps(data))
             messagebox.showinfo(bidi_text("הצלחה"), bidi_text("הקבוצות נשמרו בהצלחה"))
 
     def _load_groups(self):
         filename = filedialog.askopenfilename(filetypes=[("JSON files", "*.json")])
         if filename:
             try:
-                with open(filename, 'r') as f:
-                    data = json.load(f)
+                with open(filename, 'rb') as f:
+                    data = json_io.loads(f.read())
                 self.groups = []
                 for d in data:
                     self.groups.append(Group.from_dict(d))
@@ -498,8 +499,8 @@ class App:
                     "groups": [g.to_dict() for g in self.groups],
                     "schedule": self.schedule.to_dict()
                 }
-                with open(filename, 'w') as f:
-                    json.dump(data, f, indent=2)
+                with open(filename, 'wb') as f:
+                    f.write(json_io.dumps(data))
                 messagebox.showinfo(bidi_text("הצלחה"), bidi_text("הסידור נשמר בהצלחה"))
             except Exception as e:
                 messagebox.showerror(bidi_text("שגיאה"), bidi_text(f"נכשל בשמירת הסידור: {e}"))
@@ -508,8 +509,8 @@ class App:
         filename = filedialog.askopenfilename(filetypes=[("JSON files", "*.json")])
         if filename:
             try:
-                with open(filename, 'r') as f:
-                    data = json.load(f)
+                with open(filename, 'rb') as f:
+                    data = json_io.loads(f.read())
                 self.groups = []
                 for d in data.get("groups", []):
                     self.groups.append(Group.from_dict(d))
@@ -536,6 +537,8 @@ class App:
             slot_map = {}
             for slot in self.schedule.slots:
                 slot_map[(slot.date, slot.hour, slot.position)] = slot.group_id
+            group_names = {g.id: g.name for g in self.groups}
+            group_names[DISABLED_ID] = "---"
             for hour in range(24):
                 row = {"שעה": f"{hour:02d}:00 - {hour+1:02d}:00"}
                 current = start_date
@@ -545,13 +548,8 @@ class App:
                     our_wd = (py_wd + 1) % 7
                     day_name = days_names[our_wd]
                     header = f"{day_name} {current.strftime('%d/%m')}"
-                    g1_id = slot_map.get((date_str, hour, 1))
-                    g2_id = slot_map.get((date_str, hour, 2))
-                    def get_name(gid):
-                        if gid == DISABLED_ID: return "---"
-                        return next((g.name for g in self.groups if g.id == gid), "")
-                    g1_name = get_name(g1_id)
-                    g2_name = get_name(g2_id)
+                    g1_name = group_names.get(slot_map.get((date_str, hour, 1)), "")
+                    g2_name = group_names.get(slot_map.get((date_str, hour, 2)), "")
                     row[f"{header} עמדה 1"] = g1_name
                     row[f"{header} עמדה 2"] = g2_name
                     current += timedelta(days=1)
@@ -4,7 +4,7 @@ from typing import List, Callable, Optional, Tuple, Set
 from datetime import datetime, date, timedelta
 import calendar
 from shmirot_gdud.core.models import TimeWindow, Group, ScheduleRange, DateConstraint, StaffingRule, StaffingException
-from shmirot_gdud.core.config import config
+from shmirot_gdud.core.config import get_config
 from shmirot_gdud.gui.utils import bidi_text
 
 # Set calendar to start on Sunday
@@ -576,7 +576,7 @@ class AdvancedSettingsDialog(tk.Toplevel):
         def add_field(label, key, tooltip=""):
             nonlocal row
             ttk.Label(main_frame, text=bidi_text(label)).grid(row=row, column=1, sticky=tk.E, pady=5)
-            var = tk.StringVar(value=str(getattr(config, key)))
+            var = tk.StringVar(value=str(getattr(get_config(), key)))
             ttk.Entry(main_frame, textvariable=var, width=10).grid(row=row, column=0, pady=5)
             self.entries[key] = var
             row += 1
@@ -598,6 +598,7 @@ class AdvancedSettingsDialog(tk.Toplevel):
 
     def _save(self):
         try:
+            config = get_config()
             for key, var in self.entries.items():
                 val = var.get()
                 # Determine type (int or float)
@@ -143,6 +143,7 @@ class ScheduleGrid(tk.Canvas):
         slot_map = {}
         for slot in self.schedule.slots:
             slot_map[(slot.date, slot.hour, slot.position)] = slot
+        group_by_id = {g.id: g for g in self.groups}
 
         current = start_date
         for d in range(num_days):
@@ -157,13 +158,13 @@ class ScheduleGrid(tk.Canvas):
                 # Position 1 (Right half)
                 s1 = slot_map.get((date_str, h, 1))
                 g1_id = s1.group_id if s1 else None
-                g1_name, g1_color = self._get_group_info(g1_id)
+                g1_name, g1_color = self._get_group_info(g1_id, group_by_id)
                 self._draw_slot(x + half_width, y, half_width, self.cell_height, bidi_text(g1_name), g1_color, (date_str, h, 1), font_size, g1_id)
                 
                 # Position 2 (Left half)
                 s2 = slot_map.get((date_str, h, 2))
                 g2_id = s2.group_id if s2 else None
-                g2_name, g2_color = self._get_group_info(g2_id)
+                g2_name, g2_color = self._get_group_info(g2_id, group_by_id)
                 self._draw_slot(x, y, half_width, self.cell_height, bidi_text(g2_name), g2_color, (date_str, h, 2), font_size, g2_id)
 
             current += timedelta(days=1)
@@ -213,15 +214,18 @@ class ScheduleGrid(tk.Canvas):
         if h > 10 and w > 20:
             text_id = self.create_text(x+w//2, y+h//2, text=text, fill=text_color, font=("Arial", font_size), tags=f"text_{slot_key}")
 
-    def _get_group_info(self, group_id):
+    def _get_group_info(self, group_id, group_by_id: Optional[Dict[str, Group]] = None):
+        # redraw passes an id -> group dict so each slot is one lookup
         if not group_id: return "", "white"
         
         if group_id == DISABLED_ID:
             return "---", "#555555" 
             
-        for g in self.groups:
-            if g.id == group_id:
-                return g.name, g.color
+        if group_by_id is None:
+            group_by_id = {g.id: g for g in self.groups}
+        g = group_by_id.get(group_id)
+        if g:
+            return g.name, g.color
         return "?", "white"
 
     def _get_slot_at(self, x, y) -> Optional[Tuple[str, int, int]]: